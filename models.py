@@ -1,9 +1,115 @@
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import torch.distributed as dist
 
 import numpy as np
 
+class AllGather(torch.autograd.Function):
+    """
+    All Gather across GPUs into One (Pre-Allocated) Tensor
+    Backward: Reduce Scatter (Each Rank Gets Grad of Its Own Slice Summed over All Ranks)
+    """
+    @staticmethod
+    def forward(ctx, x, gathered):
+        ctx.batch_size=x.shape[0]
+        # Shape: (world_size * batch_size) x hidden_dim
+        dist.all_gather_into_tensor(gathered, x.contiguous())
+        # Written In-Place
+        ctx.mark_dirty(gathered)
+        return gathered
+
+    @staticmethod
+    def backward(ctx, grad_gathered):
+        # Shape: batch_size x hidden_dim
+        grad=torch.empty(ctx.batch_size, *grad_gathered.shape[1:], dtype=grad_gathered.dtype, device=grad_gathered.device)
+        dist.reduce_scatter_tensor(grad, grad_gathered.contiguous())
+        return grad, None
+
+def all_gather(x, cache, world_size, chunks=1):
+    """
+    All Gather with Grad Fn
+    x Holds Chunks (e.g. Sentence, Positive, Hard Negative) Concatenated on Batch Dim
+    Gathered in One Collective, then Regrouped so .chunk(chunks) Splits Them as Before
+    Output Buffers are Kept in cache: (shape, dtype, device) -> Tensor, Reused over Steps
+    """
+    # Mixed Precision: Communicate in Autocast Dtype (Half the Bytes of FP32)
+    # Already Unit-Norm (Normalized in Pooler), Similarity GEMM Runs in Autocast Dtype Anyway
+    if torch.is_autocast_enabled():
+        x=x.to(torch.get_autocast_gpu_dtype())
+
+    # Shape: (world_size * chunks * batch_size) x hidden_dim
+    shape=(world_size*x.shape[0], *x.shape[1:])
+    gathered=cache.get((shape, x.dtype, x.device))
+    if gathered is None:
+        gathered=torch.empty(shape, dtype=x.dtype, device=x.device)
+        cache[(shape, x.dtype, x.device)]=gathered
+    # Detached: Cached Buffer Stays Out of Autograd (NO grad_fn Linking to Previous Step's Freed Graph)
+    gathered=AllGather.apply(x, gathered.detach())
+
+    # Shape: (chunks * world_size * batch_size) x hidden_dim
+    return gathered.reshape(world_size, chunks, -1, x.shape[-1]).transpose(0, 1).reshape(-1, x.shape[-1])
+
+def concat_batch(inputs, preseqlen=0):
+    """
+    Pad Inputs to Same Sequence Length and Concatenate on Batch Dim
+    Attention Mask Hides Only the Added Padding (Same Outputs as Separate Forwards)
+    """
+    max_len=max(x.shape[1] for x in inputs)
+
+    # (len(inputs) * batch_size) x max_len
+    input_ids=torch.cat([F.pad(x, (0, max_len-x.shape[1])) for x in inputs], dim=0)
+    # (len(inputs) * batch_size) x max_len
+    attention_mask=torch.cat([F.pad(torch.ones_like(x), (0, max_len-x.shape[1])) for x in inputs], dim=0)
+    # Prefix is Always Attended
+    # (len(inputs) * batch_size) x (preseqlen + max_len)
+    attention_mask=F.pad(attention_mask, (preseqlen, 0), value=1)
+
+    return input_ids, attention_mask
+
+def scaled_sim(x, y, temp):
+    """
+    Inner Product / Temperature: x @ y.T / temp
+    Scale Folded into GEMM (alpha), NO Separate Divide Kernel
+    """
+    # input is Ignored (beta=0)
+    return torch.addmm(x.new_empty(()), x, y.T, beta=0, alpha=1/temp)
+
+def _contrastive_loss(repr_sent, repr_cand, label, temp):
+    """
+    Contrastive Loss: Cross Entropy over Cosine Similarity / Temperature
+    repr_sent, repr_cand: Unit-Norm (Normalized in Pooler), Cosine Similarity is Inner Product
+    repr_cand: Candidates (Positive of Each Sentence at Its label Index)
+    """
+    # Cosine Similarity (Single GEMM)
+    sim=scaled_sim(repr_sent, repr_cand, temp)
+
+    return F.cross_entropy(sim, label)
+
+def _bidirectional_contrastive_loss(repr_sent, repr_pos, repr_neg, label, temp):
+    """
+    2(Row & Column)-Directional Contrastive Loss (CPT)
+    repr_sent, repr_pos, repr_neg: Unit-Norm (Normalized in Pooler), Cosine Similarity is Inner Product
+    repr_neg: Hard Negatives (None on Unsupervised Setting)
+    """
+    # Cosine Similarity
+    if repr_neg is None:
+        sim_x=scaled_sim(repr_sent, repr_pos, temp)
+        # Column-Directional Similarity is Transpose of Row-Directional (NO 2nd GEMM)
+        sim_y=sim_x.T
+    else:
+        # Candidates: Positives (First N Columns), Hard Negatives
+        sim_x=scaled_sim(repr_sent, torch.cat([repr_pos, repr_neg], dim=0), temp)
+        # Positive-Sentence Block is Transpose of Sentence-Positive Block (Only Hard Negatives Need GEMM)
+        sim_y=torch.cat([sim_x[:,:repr_sent.size(0)].T, scaled_sim(repr_pos, repr_neg, temp)], dim=1)
+
+    return (F.cross_entropy(sim_x, label)+F.cross_entropy(sim_y, label))/2
+
+# Loss Region Compiled (Backbone is NOT): Pointwise Ops Fused around GEMM
+# Dynamic Shapes: Batch Size Varies (Last Batch, World Size)
+contrastive_loss=torch.compile(_contrastive_loss, dynamic=True)
+bidirectional_contrastive_loss=torch.compile(_bidirectional_contrastive_loss, dynamic=True)
+
 class SupervisedSimCSE(nn.Module):
     """
     Supervised SimCSE
@@ -16,64 +122,63 @@ class SupervisedSimCSE(nn.Module):
         # Pre-Trained LM
         self.pretrained=pretrained
         
-        # Cosine Similarity
-        self.cos_sim=nn.CosineSimilarity(dim=-1)
         # Temperature (Hyperparam)
         self.temp=0.05
         
-        # Contrastive Loss
-        self.loss=nn.CrossEntropyLoss()
+        # Contrastive Loss: Labels Cached on Device, (size, offset, device) -> offset ... offset+size
+        self.label_cache={}
+        # All Gather: Buffers Reused over Steps, (shape, dtype, device) -> Tensor
+        self.gather_cache={}
+        # Multi-GPU: World Size, Rank Cached (Build Model after Process Group is Created)
+        self.world_size=dist.get_world_size() if dist.is_initialized() else 1
+        self.rank=dist.get_rank() if dist.is_initialized() else 0
         
     def pooler(self, x):
         # [CLS] without MLP (Hyperparam)
-        return x.last_hidden_state[:,0,:]
+        # Unit-Norm (Cosine Similarity is Inner Product), Contiguous so Chunks and All Gather Need No Extra Copy
+        return F.normalize(x.last_hidden_state[:,0,:], dim=-1)
     
     def get_embedding(self, x):
-        # Return Sentence Representation
+        # Return Sentence Representation (Unit-Norm)
         x=self.pretrained(x)
         return self.pooler(x)
     
+    def get_label(self, size, offset, device):
+        # Return Label of Contrastive Loss (Positive Index)
+        label=self.label_cache.get((size, offset, device))
+        if label is None:
+            label=torch.arange(offset, offset+size, dtype=torch.long, device=device)
+            self.label_cache[(size, offset, device)]=label
+        return label
+
     def forward(self, sent, pos, neg):
-        # Forward
-        sent=self.pretrained(sent)
-        pos=self.pretrained(pos)
-        neg=self.pretrained(neg)
+        # Forward (Sentence, Positive, Hard Negative in One Batch)
+        x, attention_mask=concat_batch([sent, pos, neg])
+        x=self.pretrained(x, attention_mask=attention_mask)
         
         # Pooling
+        # Shape: (3 * batch_size) x hidden_dim
+        repr_batch=self.pooler(x)
+
         # Shape: batch_size x hidden_dim
-        repr_sent=self.pooler(sent)
-        repr_pos=self.pooler(pos)
-        repr_neg=self.pooler(neg)
-
-        # Multi-GPU
-        if dist.is_initialized():
-            repr_list_sent=[torch.zeros_like(repr_sent) for _ in range(dist.get_world_size())]
-            repr_list_pos=[torch.zeros_like(repr_pos) for _ in range(dist.get_world_size())]
-            repr_list_neg=[torch.zeros_like(repr_neg) for _ in range(dist.get_world_size())]
-
-            # All Gather
-            dist.all_gather(tensor_list=repr_list_sent, tensor=repr_sent.contiguous())
-            dist.all_gather(tensor_list=repr_list_pos, tensor=repr_pos.contiguous())
-            dist.all_gather(tensor_list=repr_list_neg, tensor=repr_neg.contiguous())
-
-            # Grad Fn
-            repr_list_sent[dist.get_rank()]=repr_sent
-            repr_list_pos[dist.get_rank()]=repr_pos
-            repr_list_neg[dist.get_rank()]=repr_neg
-            
-            # Shape: (world_size * batch_size) x hidden_dim
-            repr_sent=torch.cat(repr_list_sent, dim=0)
-            repr_pos=torch.cat(repr_list_pos, dim=0)
-            repr_neg=torch.cat(repr_list_neg, dim=0)
+        repr_sent=repr_batch[:sent.shape[0]]
+        # Candidates: Positives (First N Rows), Hard Negatives
+        # Shape: (2 * batch_size) x hidden_dim
+        repr_cand=repr_batch[sent.shape[0]:]
+        # Index of First Positive in Candidates
+        offset=0
+
+        # Multi-GPU (Skipped on world_size 1)
+        if self.world_size>1:
+            # All Gather Only Candidates: Sentences Stay Local (Each Rank Scores Its Own Sentences)
+            # Shape: (world_size * 2 * batch_size) x hidden_dim
+            repr_cand=all_gather(repr_cand, cache=self.gather_cache, world_size=self.world_size)
+            # Candidates of Local Rank (Positives First) Follow Those of Previous Ranks
+            offset=self.rank*2*repr_sent.shape[0]
 
-        # Cosine Similarity
-        sim_pos=self.cos_sim(repr_sent.unsqueeze(1), repr_pos.unsqueeze(0))/self.temp
-        sim_neg=self.cos_sim(repr_sent.unsqueeze(1), repr_neg.unsqueeze(0))/self.temp
-        
         # Contrastive Loss
-        sim=torch.cat([sim_pos, sim_neg], dim=1)
-        label=torch.arange(sim.size(0)).long().to(sim.device)
-        loss=self.loss(sim, label)
+        label=self.get_label(size=repr_sent.size(0), offset=offset, device=repr_sent.device)
+        loss=contrastive_loss(repr_sent, repr_cand, label, self.temp)
         
         return loss
 
@@ -91,57 +196,61 @@ class UnsupervisedSimCSE(nn.Module):
         # Pooling Layer: MLP (Train Only)
         self.mlp=nn.Linear(self.pretrained.config.hidden_size, self.pretrained.config.hidden_size)
         
-        # Cosine Similarity
-        self.cos_sim=nn.CosineSimilarity(dim=-1)
         # Temperature (Hyperparam)
         self.temp=0.05
         
-        # Contrastive Loss
-        self.loss=nn.CrossEntropyLoss()
+        # Contrastive Loss: Labels Cached on Device, (size, offset, device) -> offset ... offset+size
+        self.label_cache={}
+        # All Gather: Buffers Reused over Steps, (shape, dtype, device) -> Tensor
+        self.gather_cache={}
+        # Multi-GPU: World Size, Rank Cached (Build Model after Process Group is Created)
+        self.world_size=dist.get_world_size() if dist.is_initialized() else 1
+        self.rank=dist.get_rank() if dist.is_initialized() else 0
         
     def pooler(self, x):
         # [CLS] with MLP (Train Only)
+        # Unit-Norm (Cosine Similarity is Inner Product)
         x=x.last_hidden_state[:,0,:]
-        return self.mlp(x)
+        return F.normalize(self.mlp(x), dim=-1)
     
     def get_embedding(self, x):
-        # Return Sentence Representation
+        # Return Sentence Representation (Unit-Norm)
         x=self.pretrained(x)
-        return x.last_hidden_state[:,0,:]
+        return F.normalize(x.last_hidden_state[:,0,:], dim=-1)
     
+    def get_label(self, size, offset, device):
+        # Return Label of Contrastive Loss (Positive Index)
+        label=self.label_cache.get((size, offset, device))
+        if label is None:
+            label=torch.arange(offset, offset+size, dtype=torch.long, device=device)
+            self.label_cache[(size, offset, device)]=label
+        return label
+
     def forward(self, sent, pos):
-        # Forward
-        sent=self.pretrained(sent)
-        pos=self.pretrained(pos)
+        # Forward (Sentence, Positive in One Batch)
+        x, attention_mask=concat_batch([sent, pos])
+        x=self.pretrained(x, attention_mask=attention_mask)
         
         # Pooling
-        # Shape: batch_size x hidden_dim
-        repr_sent=self.pooler(sent)
-        repr_pos=self.pooler(pos)
-
-        # Multi-GPU
-        if dist.is_initialized():
-            repr_list_sent=[torch.zeros_like(repr_sent) for _ in range(dist.get_world_size())]
-            repr_list_pos=[torch.zeros_like(repr_pos) for _ in range(dist.get_world_size())]
+        # Shape: (2 * batch_size) x hidden_dim
+        repr_batch=self.pooler(x)
 
-            # All Gather
-            dist.all_gather(tensor_list=repr_list_sent, tensor=repr_sent.contiguous())
-            dist.all_gather(tensor_list=repr_list_pos, tensor=repr_pos.contiguous())
+        # Shape: batch_size x hidden_dim
+        repr_sent, repr_pos=repr_batch.chunk(2, dim=0)
+        # Index of First Positive
+        offset=0
 
-            # Grad Fn
-            repr_list_sent[dist.get_rank()]=repr_sent
-            repr_list_pos[dist.get_rank()]=repr_pos
-            
+        # Multi-GPU (Skipped on world_size 1)
+        if self.world_size>1:
+            # All Gather Only Positives: Sentences Stay Local (Each Rank Scores Its Own Sentences)
             # Shape: (world_size * batch_size) x hidden_dim
-            repr_sent=torch.cat(repr_list_sent, dim=0)
-            repr_pos=torch.cat(repr_list_pos, dim=0)
+            repr_pos=all_gather(repr_pos, cache=self.gather_cache, world_size=self.world_size)
+            # Positives of Local Rank Follow Those of Previous Ranks
+            offset=self.rank*repr_sent.shape[0]
 
-        # Cosine Similarity
-        sim=self.cos_sim(repr_sent.unsqueeze(1), repr_pos.unsqueeze(0))/self.temp
-        
         # Contrastive Loss
-        label=torch.arange(sim.size(0)).long().to(sim.device)
-        loss=self.loss(sim, label)
+        label=self.get_label(size=repr_sent.size(0), offset=offset, device=repr_sent.device)
+        loss=contrastive_loss(repr_sent, repr_pos, label, self.temp)
         
         return loss
 
@@ -159,8 +268,8 @@ class PrefixSupervisedSimCSE(nn.Module):
         ## Prefix-Tuning
         # Config of Base (Pre-Trained) LM
         self.base_config=base_config
-        # Input: 0, 1, 2 ... preseqlen
-        self.preseq=torch.arange(preseqlen)
+        # Sequence Length of Prefix
+        self.preseqlen=preseqlen
         # Embedding
         self.embd=nn.Embedding(preseqlen, base_config.hidden_size)
         # Reparam
@@ -169,90 +278,97 @@ class PrefixSupervisedSimCSE(nn.Module):
             nn.ReLU(),
             nn.Linear(hidden_dim, 2*base_config.num_hidden_layers*base_config.hidden_size)
         )
+        # Small Input (preseqlen Rows): Launch-Bound, Compiled to Fuse ReLU into GEMM
+        # Compiled In-Place, so Keys of State Dict are Unchanged
+        self.reparam.compile()
 
         ## SimCSE
-        # Cosine Similarity
-        self.cos_sim=nn.CosineSimilarity(dim=-1)
         # Temperature (Hyperparam)
         self.temp=0.05
-        # Contrastive Loss
-        self.loss=nn.CrossEntropyLoss()
+        # Contrastive Loss: Labels Cached on Device, (size, offset, device) -> offset ... offset+size
+        self.label_cache={}
+        # All Gather: Buffers Reused over Steps, (shape, dtype, device) -> Tensor
+        self.gather_cache={}
+        # Multi-GPU: World Size, Rank Cached (Build Model after Process Group is Created)
+        self.world_size=dist.get_world_size() if dist.is_initialized() else 1
+        self.rank=dist.get_rank() if dist.is_initialized() else 0
         
     def pooler(self, x):
         # [CLS] without MLP (Hyperparam)
-        return x.last_hidden_state[:,0,:]
+        # Unit-Norm (Cosine Similarity is Inner Product), Contiguous so Chunks and All Gather Need No Extra Copy
+        return F.normalize(x.last_hidden_state[:,0,:], dim=-1)
 
-    def get_prefix(self, batch_size, device):
+    def get_prefix(self, batch_size):
         # Return Prefix
-        # batch_size, preseqlen
-        preseq=self.preseq.unsqueeze(0).expand(batch_size, -1).to(device)
-        # batch_size, preseqlen, hidden_size
-        preseq=self.embd(preseq)
-        # batch_size, preseqlen, 2*num_hidden_layers*hidden_size
+        # Prefix is Same for All Samples: Embedding, Reparam Run Only Once (NOT per Sample)
+        # preseqlen, hidden_size
+        # Input 0, 1, 2 ... preseqlen Selects Every Row in Order: Embedding Weight Itself (NO Lookup)
+        preseq=self.embd.weight
+        # preseqlen, 2*num_hidden_layers*hidden_size
         preseq=self.reparam(preseq)
-        # batch_size, preseqlen, 2*num_hidden_layers, num_attention_heads, hidden_size/num_attention_heads
+        # preseqlen, 2*num_hidden_layers, num_attention_heads, hidden_size/num_attention_heads
         preseq=preseq.reshape(
-            batch_size,
-            len(self.preseq),
+            self.preseqlen,
             2*self.base_config.num_hidden_layers,
             self.base_config.num_attention_heads,
             int(self.base_config.hidden_size/self.base_config.num_attention_heads)
         )
+        # 2*num_hidden_layers, num_attention_heads, preseqlen, hidden_size/num_attention_heads
+        # Permuted into Contiguous Layout Once, before Batch Dim is Added
+        preseq=preseq.permute(1, 2, 0, 3).contiguous()
         # 2*num_hidden_layers, batch_size, num_attention_heads, preseqlen, hidden_size/num_attention_heads
-        past_key_values=preseq.permute(2, 0, 3, 1, 4)
+        # Expand: View with Stride 0 on Batch Dim (NO Copy), LM Only Reads Prefix (torch.cat with Key, Value)
+        past_key_values=preseq.unsqueeze(1).expand(-1, batch_size, -1, -1, -1)
 
         return past_key_values.split(2)
         
     def get_embedding(self, pretrained, x):
-        # Return Sentence Representation
-        prefix=self.get_prefix(batch_size=x.shape[0], device=x.device)
+        # Return Sentence Representation (Unit-Norm)
+        prefix=self.get_prefix(batch_size=x.shape[0])
         x=pretrained(x, past_key_values=prefix)
         return self.pooler(x)
 
+    def get_label(self, size, offset, device):
+        # Return Label of Contrastive Loss (Positive Index)
+        label=self.label_cache.get((size, offset, device))
+        if label is None:
+            label=torch.arange(offset, offset+size, dtype=torch.long, device=device)
+            self.label_cache[(size, offset, device)]=label
+        return label
+
     def forward(self, pretrained, sent, pos, neg):
+        # Sentence, Positive, Hard Negative in One Batch
+        x, attention_mask=concat_batch([sent, pos, neg], preseqlen=self.preseqlen)
+
         # Get Prefix
-        prefix=self.get_prefix(batch_size=sent.shape[0], device=sent.device)
+        prefix=self.get_prefix(batch_size=x.shape[0])
         
         # Forward with Prefix
-        sent=pretrained(sent, past_key_values=prefix)
-        pos=pretrained(pos, past_key_values=prefix)
-        neg=pretrained(neg, past_key_values=prefix)
+        x=pretrained(x, attention_mask=attention_mask, past_key_values=prefix)
         
         # Pooling
+        # Shape: (3 * batch_size) x hidden_dim
+        repr_batch=self.pooler(x)
+
         # Shape: batch_size x hidden_dim
-        repr_sent=self.pooler(sent)
-        repr_pos=self.pooler(pos)
-        repr_neg=self.pooler(neg)
-
-        # Multi-GPU
-        if dist.is_initialized():
-            repr_list_sent=[torch.zeros_like(repr_sent) for _ in range(dist.get_world_size())]
-            repr_list_pos=[torch.zeros_like(repr_pos) for _ in range(dist.get_world_size())]
-            repr_list_neg=[torch.zeros_like(repr_neg) for _ in range(dist.get_world_size())]
-
-            # All Gather
-            dist.all_gather(tensor_list=repr_list_sent, tensor=repr_sent.contiguous())
-            dist.all_gather(tensor_list=repr_list_pos, tensor=repr_pos.contiguous())
-            dist.all_gather(tensor_list=repr_list_neg, tensor=repr_neg.contiguous())
-
-            # Grad Fn
-            repr_list_sent[dist.get_rank()]=repr_sent
-            repr_list_pos[dist.get_rank()]=repr_pos
-            repr_list_neg[dist.get_rank()]=repr_neg
-            
-            # Shape: (world_size * batch_size) x hidden_dim
-            repr_sent=torch.cat(repr_list_sent, dim=0)
-            repr_pos=torch.cat(repr_list_pos, dim=0)
-            repr_neg=torch.cat(repr_list_neg, dim=0)
+        repr_sent=repr_batch[:sent.shape[0]]
+        # Candidates: Positives (First N Rows), Hard Negatives
+        # Shape: (2 * batch_size) x hidden_dim
+        repr_cand=repr_batch[sent.shape[0]:]
+        # Index of First Positive in Candidates
+        offset=0
+
+        # Multi-GPU (Skipped on world_size 1)
+        if self.world_size>1:
+            # All Gather Only Candidates: Sentences Stay Local (Each Rank Scores Its Own Sentences)
+            # Shape: (world_size * 2 * batch_size) x hidden_dim
+            repr_cand=all_gather(repr_cand, cache=self.gather_cache, world_size=self.world_size)
+            # Candidates of Local Rank (Positives First) Follow Those of Previous Ranks
+            offset=self.rank*2*repr_sent.shape[0]
 
-        # Cosine Similarity
-        sim_pos=self.cos_sim(repr_sent.unsqueeze(1), repr_pos.unsqueeze(0))/self.temp
-        sim_neg=self.cos_sim(repr_sent.unsqueeze(1), repr_neg.unsqueeze(0))/self.temp
-        
         # Contrastive Loss
-        sim=torch.cat([sim_pos, sim_neg], dim=1)
-        label=torch.arange(sim.size(0)).long().to(sim.device)
-        loss=self.loss(sim, label)
+        label=self.get_label(size=repr_sent.size(0), offset=offset, device=repr_sent.device)
+        loss=contrastive_loss(repr_sent, repr_cand, label, self.temp)
         
         return loss
 
@@ -270,8 +386,8 @@ class PrefixUnsupervisedSimCSE(nn.Module):
         ## Prefix-Tuning
         # Config of Base (Pre-Trained) LM
         self.base_config=base_config
-        # Input: 0, 1, 2 ... preseqlen
-        self.preseq=torch.arange(preseqlen)
+        # Sequence Length of Prefix
+        self.preseqlen=preseqlen
         # Embedding
         self.embd=nn.Embedding(preseqlen, base_config.hidden_size)
         # Reparam
@@ -280,85 +396,97 @@ class PrefixUnsupervisedSimCSE(nn.Module):
             nn.ReLU(),
             nn.Linear(hidden_dim, 2*base_config.num_hidden_layers*base_config.hidden_size)
         )
+        # Small Input (preseqlen Rows): Launch-Bound, Compiled to Fuse ReLU into GEMM
+        # Compiled In-Place, so Keys of State Dict are Unchanged
+        self.reparam.compile()
 
         ## SimCSE
         # Pooling Layer: MLP (Train Only)
         self.mlp=nn.Linear(base_config.hidden_size, base_config.hidden_size)
-        # Cosine Similarity
-        self.cos_sim=nn.CosineSimilarity(dim=-1)
         # Temperature (Hyperparam)
         self.temp=0.05
-        # Contrastive Loss
-        self.loss=nn.CrossEntropyLoss()
+        # Contrastive Loss: Labels Cached on Device, (size, offset, device) -> offset ... offset+size
+        self.label_cache={}
+        # All Gather: Buffers Reused over Steps, (shape, dtype, device) -> Tensor
+        self.gather_cache={}
+        # Multi-GPU: World Size, Rank Cached (Build Model after Process Group is Created)
+        self.world_size=dist.get_world_size() if dist.is_initialized() else 1
+        self.rank=dist.get_rank() if dist.is_initialized() else 0
         
     def pooler(self, x):
         # [CLS] with MLP (Train Only)
+        # Unit-Norm (Cosine Similarity is Inner Product)
         x=x.last_hidden_state[:,0,:]
-        return self.mlp(x)
+        return F.normalize(self.mlp(x), dim=-1)
 
-    def get_prefix(self, batch_size, device):
+    def get_prefix(self, batch_size):
         # Return Prefix
-        # batch_size, preseqlen
-        preseq=self.preseq.unsqueeze(0).expand(batch_size, -1).to(device)
-        # batch_size, preseqlen, hidden_size
-        preseq=self.embd(preseq)
-        # batch_size, preseqlen, 2*num_hidden_layers*hidden_size
+        # Prefix is Same for All Samples: Embedding, Reparam Run Only Once (NOT per Sample)
+        # preseqlen, hidden_size
+        # Input 0, 1, 2 ... preseqlen Selects Every Row in Order: Embedding Weight Itself (NO Lookup)
+        preseq=self.embd.weight
+        # preseqlen, 2*num_hidden_layers*hidden_size
         preseq=self.reparam(preseq)
-        # batch_size, preseqlen, 2*num_hidden_layers, num_attention_heads, hidden_size/num_attention_heads
+        # preseqlen, 2*num_hidden_layers, num_attention_heads, hidden_size/num_attention_heads
         preseq=preseq.reshape(
-            batch_size,
-            len(self.preseq),
+            self.preseqlen,
             2*self.base_config.num_hidden_layers,
             self.base_config.num_attention_heads,
             int(self.base_config.hidden_size/self.base_config.num_attention_heads)
         )
+        # 2*num_hidden_layers, num_attention_heads, preseqlen, hidden_size/num_attention_heads
+        # Permuted into Contiguous Layout Once, before Batch Dim is Added
+        preseq=preseq.permute(1, 2, 0, 3).contiguous()
         # 2*num_hidden_layers, batch_size, num_attention_heads, preseqlen, hidden_size/num_attention_heads
-        past_key_values=preseq.permute(2, 0, 3, 1, 4)
+        # Expand: View with Stride 0 on Batch Dim (NO Copy), LM Only Reads Prefix (torch.cat with Key, Value)
+        past_key_values=preseq.unsqueeze(1).expand(-1, batch_size, -1, -1, -1)
 
         return past_key_values.split(2)
 
     def get_embedding(self, pretrained, x):
-        # Return Sentence Representation
-        prefix=self.get_prefix(batch_size=x.shape[0], device=x.device)
+        # Return Sentence Representation (Unit-Norm)
+        prefix=self.get_prefix(batch_size=x.shape[0])
         x=pretrained(x, past_key_values=prefix)
-        return x.last_hidden_state[:,0,:]
+        return F.normalize(x.last_hidden_state[:,0,:], dim=-1)
     
+    def get_label(self, size, offset, device):
+        # Return Label of Contrastive Loss (Positive Index)
+        label=self.label_cache.get((size, offset, device))
+        if label is None:
+            label=torch.arange(offset, offset+size, dtype=torch.long, device=device)
+            self.label_cache[(size, offset, device)]=label
+        return label
+
     def forward(self, pretrained, sent, pos):
+        # Sentence, Positive in One Batch
+        x, attention_mask=concat_batch([sent, pos], preseqlen=self.preseqlen)
+
         # Get Prefix
-        prefix=self.get_prefix(batch_size=sent.shape[0], device=sent.device)
+        prefix=self.get_prefix(batch_size=x.shape[0])
 
         # Forward with Prefix
-        sent=pretrained(sent, past_key_values=prefix)
-        pos=pretrained(pos, past_key_values=prefix)
+        x=pretrained(x, attention_mask=attention_mask, past_key_values=prefix)
         
         # Pooling
-        # Shape: batch_size x hidden_dim
-        repr_sent=self.pooler(sent)
-        repr_pos=self.pooler(pos)
-
-        # Multi-GPU
-        if dist.is_initialized():
-            repr_list_sent=[torch.zeros_like(repr_sent) for _ in range(dist.get_world_size())]
-            repr_list_pos=[torch.zeros_like(repr_pos) for _ in range(dist.get_world_size())]
+        # Shape: (2 * batch_size) x hidden_dim
+        repr_batch=self.pooler(x)
 
-            # All Gather
-            dist.all_gather(tensor_list=repr_list_sent, tensor=repr_sent.contiguous())
-            dist.all_gather(tensor_list=repr_list_pos, tensor=repr_pos.contiguous())
+        # Shape: batch_size x hidden_dim
+        repr_sent, repr_pos=repr_batch.chunk(2, dim=0)
+        # Index of First Positive
+        offset=0
 
-            # Grad Fn
-            repr_list_sent[dist.get_rank()]=repr_sent
-            repr_list_pos[dist.get_rank()]=repr_pos
-            
+        # Multi-GPU (Skipped on world_size 1)
+        if self.world_size>1:
+            # All Gather Only Positives: Sentences Stay Local (Each Rank Scores Its Own Sentences)
             # Shape: (world_size * batch_size) x hidden_dim
-            repr_sent=torch.cat(repr_list_sent, dim=0)
-            repr_pos=torch.cat(repr_list_pos, dim=0)
+            repr_pos=all_gather(repr_pos, cache=self.gather_cache, world_size=self.world_size)
+            # Positives of Local Rank Follow Those of Previous Ranks
+            offset=self.rank*repr_sent.shape[0]
 
-        # Cosine Similarity
-        sim=self.cos_sim(repr_sent.unsqueeze(1), repr_pos.unsqueeze(0))/self.temp
-        
         # Contrastive Loss
-        label=torch.arange(sim.size(0)).long().to(sim.device)
-        loss=self.loss(sim, label)
+        label=self.get_label(size=repr_sent.size(0), offset=offset, device=repr_sent.device)
+        loss=contrastive_loss(repr_sent, repr_pos, label, self.temp)
         
         return loss
 
@@ -378,23 +506,27 @@ class SupervisedCPT(nn.Module):
         # Pooling Layer: MLP
         self.mlp=nn.Linear(self.pretrained.config.hidden_size, self.pretrained.config.hidden_size)
         
-        # Cosine Similarity
-        self.cos_sim=nn.CosineSimilarity(dim=-1)
         # Temperature (Hyperparam)
         self.temp=0.05
         
-        # Contrastive Loss
-        self.loss=nn.CrossEntropyLoss()
+        # Contrastive Loss: Labels Cached on Device, (size, device) -> 0, 1, 2 ... size
+        self.label_cache={}
+        # All Gather: Buffers Reused over Steps, (shape, dtype, device) -> Tensor
+        self.gather_cache={}
+        # Multi-GPU: World Size, Rank Cached (Build Model after Process Group is Created)
+        self.world_size=dist.get_world_size() if dist.is_initialized() else 1
+        self.rank=dist.get_rank() if dist.is_initialized() else 0
         
     def pooler(self, x, eos_pos):
         # [CLS] with MLP (Hyperparam)
         x=x.last_hidden_state
         index=torch.tensor(eos_pos).reshape(-1, 1, 1).expand(-1, -1, x.shape[-1])
         x=torch.gather(x, 1, index.to(x.device)).squeeze(1)
-        return self.mlp(x)
+        # Unit-Norm (Cosine Similarity is Inner Product)
+        return F.normalize(self.mlp(x), dim=-1)
     
     def get_embedding(self, x):
-        # Return Sentence Representation
+        # Return Sentence Representation (Unit-Norm)
         eos_pos=[]
         for enc in x.cpu():
             pad_pos=np.where(enc.numpy()==self.pad_token_id)[0]
@@ -402,6 +534,14 @@ class SupervisedCPT(nn.Module):
         x=self.pretrained(x)
         return self.pooler(x, eos_pos=eos_pos)
     
+    def get_label(self, size, device):
+        # Return Label of Contrastive Loss (Positive Index)
+        label=self.label_cache.get((size, device))
+        if label is None:
+            label=torch.arange(size, dtype=torch.long, device=device)
+            self.label_cache[(size, device)]=label
+        return label
+
     def forward(self, sent, pos, neg):
         # Find Position (Index) of [EOS]
         eos_pos_sent=[]
@@ -417,54 +557,27 @@ class SupervisedCPT(nn.Module):
             pad_pos=np.where(enc.numpy()==self.pad_token_id)[0]
             eos_pos_neg.append(len(enc)-1 if len(pad_pos)==0 else pad_pos.min()-1)
         
-        # Forward
-        sent=self.pretrained(sent)
-        pos=self.pretrained(pos)
-        neg=self.pretrained(neg)
+        # Forward (Sentence, Positive, Hard Negative in One Batch)
+        x, attention_mask=concat_batch([sent, pos, neg])
+        x=self.pretrained(x, attention_mask=attention_mask)
         
         # Pooling
-        # Shape: batch_size x hidden_dim
-        repr_sent=self.pooler(sent, eos_pos=eos_pos_sent)
-        repr_pos=self.pooler(pos, eos_pos=eos_pos_pos)
-        repr_neg=self.pooler(neg, eos_pos=eos_pos_neg)
-
-        # Multi-GPU
-        if dist.is_initialized():
-            repr_list_sent=[torch.zeros_like(repr_sent) for _ in range(dist.get_world_size())]
-            repr_list_pos=[torch.zeros_like(repr_pos) for _ in range(dist.get_world_size())]
-            repr_list_neg=[torch.zeros_like(repr_neg) for _ in range(dist.get_world_size())]
-
-            # All Gather
-            dist.all_gather(tensor_list=repr_list_sent, tensor=repr_sent.contiguous())
-            dist.all_gather(tensor_list=repr_list_pos, tensor=repr_pos.contiguous())
-            dist.all_gather(tensor_list=repr_list_neg, tensor=repr_neg.contiguous())
-
-            # Grad Fn
-            repr_list_sent[dist.get_rank()]=repr_sent
-            repr_list_pos[dist.get_rank()]=repr_pos
-            repr_list_neg[dist.get_rank()]=repr_neg
-            
-            # Shape: (world_size * batch_size) x hidden_dim
-            repr_sent=torch.cat(repr_list_sent, dim=0)
-            repr_pos=torch.cat(repr_list_pos, dim=0)
-            repr_neg=torch.cat(repr_list_neg, dim=0)
+        # Shape: (3 * batch_size) x hidden_dim
+        repr_batch=self.pooler(x, eos_pos=eos_pos_sent+eos_pos_pos+eos_pos_neg)
 
-        # 2(Row & Column)-Directional Cosine Similarity
-        sim_pos_x=self.cos_sim(repr_sent.unsqueeze(1), repr_pos.unsqueeze(0))/self.temp
-        sim_neg_x=self.cos_sim(repr_sent.unsqueeze(1), repr_neg.unsqueeze(0))/self.temp
+        # Multi-GPU (Skipped on world_size 1)
+        if self.world_size>1:
+            # All Gather (One Collective for Sentence, Positive, Hard Negative)
+            # Shape: (3 * world_size * batch_size) x hidden_dim
+            repr_batch=all_gather(repr_batch, cache=self.gather_cache, world_size=self.world_size, chunks=3)
 
-        sim_pos_y=self.cos_sim(repr_pos.unsqueeze(1), repr_sent.unsqueeze(0))/self.temp
-        sim_neg_y=self.cos_sim(repr_pos.unsqueeze(1), repr_neg.unsqueeze(0))/self.temp
-        
-        # Contrastive Loss
-        sim_x=torch.cat([sim_pos_x, sim_neg_x], dim=1)
-        sim_y=torch.cat([sim_pos_y, sim_neg_y], dim=1)
+        # Shape: (world_size * batch_size) x hidden_dim
+        repr_sent, repr_pos, repr_neg=repr_batch.chunk(3, dim=0)
+
+        # 2(Row & Column)-Directional Contrastive Loss
+        label=self.get_label(size=repr_sent.size(0), device=repr_sent.device)
+        loss=bidirectional_contrastive_loss(repr_sent, repr_pos, repr_neg, label, self.temp)
 
-        label=torch.arange(sim_x.size(0)).long().to(sim_x.device)
-        loss_x=self.loss(sim_x, label)
-        loss_y=self.loss(sim_y, label)
-        loss=(loss_x+loss_y)/2
-        
         return loss
 
 class UnsupervisedCPT(nn.Module):
@@ -483,23 +596,27 @@ class UnsupervisedCPT(nn.Module):
         # Pooling Layer: MLP
         self.mlp=nn.Linear(self.pretrained.config.hidden_size, self.pretrained.config.hidden_size)
         
-        # Cosine Similarity
-        self.cos_sim=nn.CosineSimilarity(dim=-1)
         # Temperature (Hyperparam)
         self.temp=0.07
         
-        # Contrastive Loss
-        self.loss=nn.CrossEntropyLoss()
+        # Contrastive Loss: Labels Cached on Device, (size, device) -> 0, 1, 2 ... size
+        self.label_cache={}
+        # All Gather: Buffers Reused over Steps, (shape, dtype, device) -> Tensor
+        self.gather_cache={}
+        # Multi-GPU: World Size, Rank Cached (Build Model after Process Group is Created)
+        self.world_size=dist.get_world_size() if dist.is_initialized() else 1
+        self.rank=dist.get_rank() if dist.is_initialized() else 0
         
     def pooler(self, x, eos_pos):
         # [CLS] with MLP (Hyperparam)
         x=x.last_hidden_state
         index=torch.tensor(eos_pos).reshape(-1, 1, 1).expand(-1, -1, x.shape[-1])
         x=torch.gather(x, 1, index.to(x.device)).squeeze(1)
-        return self.mlp(x)
+        # Unit-Norm (Cosine Similarity is Inner Product)
+        return F.normalize(self.mlp(x), dim=-1)
     
     def get_embedding(self, x):
-        # Return Sentence Representation
+        # Return Sentence Representation (Unit-Norm)
         eos_pos=[]
         for enc in x.cpu():
             pad_pos=np.where(enc.numpy()==self.pad_token_id)[0]
@@ -507,6 +624,14 @@ class UnsupervisedCPT(nn.Module):
         x=self.pretrained(x)
         return self.pooler(x, eos_pos=eos_pos)
     
+    def get_label(self, size, device):
+        # Return Label of Contrastive Loss (Positive Index)
+        label=self.label_cache.get((size, device))
+        if label is None:
+            label=torch.arange(size, dtype=torch.long, device=device)
+            self.label_cache[(size, device)]=label
+        return label
+
     def forward(self, sent, pos):
         # Find Position (Index) of [EOS]
         eos_pos_sent=[]
@@ -518,41 +643,26 @@ class UnsupervisedCPT(nn.Module):
             pad_pos=np.where(enc.numpy()==self.pad_token_id)[0]
             eos_pos_pos.append(len(enc)-1 if len(pad_pos)==0 else pad_pos.min()-1)
             
-        # Forward
-        sent=self.pretrained(sent)
-        pos=self.pretrained(pos)
+        # Forward (Sentence, Positive in One Batch)
+        x, attention_mask=concat_batch([sent, pos])
+        x=self.pretrained(x, attention_mask=attention_mask)
         
         # Pooling
-        # Shape: batch_size x hidden_dim
-        repr_sent=self.pooler(sent, eos_pos=eos_pos_sent)
-        repr_pos=self.pooler(pos, eos_pos=eos_pos_pos)
-
-        # Multi-GPU
-        if dist.is_initialized():
-            repr_list_sent=[torch.zeros_like(repr_sent) for _ in range(dist.get_world_size())]
-            repr_list_pos=[torch.zeros_like(repr_pos) for _ in range(dist.get_world_size())]
+        # Shape: (2 * batch_size) x hidden_dim
+        repr_batch=self.pooler(x, eos_pos=eos_pos_sent+eos_pos_pos)
 
-            # All Gather
-            dist.all_gather(tensor_list=repr_list_sent, tensor=repr_sent.contiguous())
-            dist.all_gather(tensor_list=repr_list_pos, tensor=repr_pos.contiguous())
+        # Multi-GPU (Skipped on world_size 1)
+        if self.world_size>1:
+            # All Gather (One Collective for Sentence, Positive)
+            # Shape: (2 * world_size * batch_size) x hidden_dim
+            repr_batch=all_gather(repr_batch, cache=self.gather_cache, world_size=self.world_size, chunks=2)
 
-            # Grad Fn
-            repr_list_sent[dist.get_rank()]=repr_sent
-            repr_list_pos[dist.get_rank()]=repr_pos
-            
-            # Shape: (world_size * batch_size) x hidden_dim
-            repr_sent=torch.cat(repr_list_sent, dim=0)
-            repr_pos=torch.cat(repr_list_pos, dim=0)
+        # Shape: (world_size * batch_size) x hidden_dim
+        repr_sent, repr_pos=repr_batch.chunk(2, dim=0)
 
-        # 2(Row & Column)-Directional Cosine Similarity
-        sim_x=self.cos_sim(repr_sent.unsqueeze(1), repr_pos.unsqueeze(0))/self.temp
-        sim_y=self.cos_sim(repr_pos.unsqueeze(1), repr_sent.unsqueeze(0))/self.temp
-        
-        # Contrastive Loss
-        label=torch.arange(sim_x.size(0)).long().to(sim_x.device)
-        loss_x=self.loss(sim_x, label)
-        loss_y=self.loss(sim_y, label)
-        loss=(loss_x+loss_y)/2
+        # 2(Row & Column)-Directional Contrastive Loss
+        label=self.get_label(size=repr_sent.size(0), device=repr_sent.device)
+        loss=bidirectional_contrastive_loss(repr_sent, repr_pos, None, label, self.temp)
 
         return loss
 
@@ -568,8 +678,8 @@ class PrefixSupervisedCPT(nn.Module):
         ## Prefix-Tuning
         # Config of Base (Pre-Trained) LM
         self.base_config=base_config
-        # Input: 0, 1, 2 ... preseqlen
-        self.preseq=torch.arange(preseqlen)
+        # Sequence Length of Prefix
+        self.preseqlen=preseqlen
         # Embedding
         self.embd=nn.Embedding(preseqlen, base_config.hidden_size)
         # Reparam
@@ -578,59 +688,77 @@ class PrefixSupervisedCPT(nn.Module):
             nn.ReLU(),
             nn.Linear(hidden_dim, 2*base_config.num_hidden_layers*base_config.hidden_size)
         )
+        # Small Input (preseqlen Rows): Launch-Bound, Compiled to Fuse ReLU into GEMM
+        # Compiled In-Place, so Keys of State Dict are Unchanged
+        self.reparam.compile()
 
         ## CPT
         # "pad_token_id" of Pre-Trained Tokenizer
         self.pad_token_id=pad_token_id
         # Pooling Layer: MLP
         self.mlp=nn.Linear(base_config.hidden_size, base_config.hidden_size)
-        # Cosine Similarity
-        self.cos_sim=nn.CosineSimilarity(dim=-1)
         # Temperature (Hyperparam)
         self.temp=0.05
-        # Contrastive Loss
-        self.loss=nn.CrossEntropyLoss()
+        # Contrastive Loss: Labels Cached on Device, (size, device) -> 0, 1, 2 ... size
+        self.label_cache={}
+        # All Gather: Buffers Reused over Steps, (shape, dtype, device) -> Tensor
+        self.gather_cache={}
+        # Multi-GPU: World Size, Rank Cached (Build Model after Process Group is Created)
+        self.world_size=dist.get_world_size() if dist.is_initialized() else 1
+        self.rank=dist.get_rank() if dist.is_initialized() else 0
         
     def pooler(self, x, eos_pos):
         # [CLS] with MLP (Hyperparam)
         x=x.last_hidden_state
         index=torch.tensor(eos_pos).reshape(-1, 1, 1).expand(-1, -1, x.shape[-1])
         x=torch.gather(x, 1, index.to(x.device)).squeeze(1)
-        return self.mlp(x)
+        # Unit-Norm (Cosine Similarity is Inner Product)
+        return F.normalize(self.mlp(x), dim=-1)
 
-    def get_prefix(self, batch_size, device):
+    def get_prefix(self, batch_size):
         # Return Prefix
-        # batch_size, preseqlen
-        preseq=self.preseq.unsqueeze(0).expand(batch_size, -1).to(device)
-        # batch_size, preseqlen, hidden_size
-        preseq=self.embd(preseq)
-        # batch_size, preseqlen, 2*num_hidden_layers*hidden_size
+        # Prefix is Same for All Samples: Embedding, Reparam Run Only Once (NOT per Sample)
+        # preseqlen, hidden_size
+        # Input 0, 1, 2 ... preseqlen Selects Every Row in Order: Embedding Weight Itself (NO Lookup)
+        preseq=self.embd.weight
+        # preseqlen, 2*num_hidden_layers*hidden_size
         preseq=self.reparam(preseq)
-        # batch_size, preseqlen, 2*num_hidden_layers, num_attention_heads, hidden_size/num_attention_heads
+        # preseqlen, 2*num_hidden_layers, num_attention_heads, hidden_size/num_attention_heads
         preseq=preseq.reshape(
-            batch_size,
-            len(self.preseq),
+            self.preseqlen,
             2*self.base_config.num_hidden_layers,
             self.base_config.num_attention_heads,
             int(self.base_config.hidden_size/self.base_config.num_attention_heads)
         )
+        # 2*num_hidden_layers, num_attention_heads, preseqlen, hidden_size/num_attention_heads
+        # Permuted into Contiguous Layout Once, before Batch Dim is Added
+        preseq=preseq.permute(1, 2, 0, 3).contiguous()
         # 2*num_hidden_layers, batch_size, num_attention_heads, preseqlen, hidden_size/num_attention_heads
-        past_key_values=preseq.permute(2, 0, 3, 1, 4)
+        # Expand: View with Stride 0 on Batch Dim (NO Copy), LM Only Reads Prefix (torch.cat with Key, Value)
+        past_key_values=preseq.unsqueeze(1).expand(-1, batch_size, -1, -1, -1)
 
         return past_key_values.split(2)
 
     def get_embedding(self, pretrained, x):
-        # Return Sentence Representation
+        # Return Sentence Representation (Unit-Norm)
         eos_pos=[]
         for enc in x.cpu():
             pad_pos=np.where(enc.numpy()==self.pad_token_id)[0]
             eos_pos.append(len(enc)-1 if len(pad_pos)==0 else pad_pos.min()-1)
 
-        prefix=self.get_prefix(batch_size=x.shape[0], device=x.device)
+        prefix=self.get_prefix(batch_size=x.shape[0])
         x=pretrained(x, past_key_values=prefix)
 
         return self.pooler(x, eos_pos=eos_pos)
 
+    def get_label(self, size, device):
+        # Return Label of Contrastive Loss (Positive Index)
+        label=self.label_cache.get((size, device))
+        if label is None:
+            label=torch.arange(size, dtype=torch.long, device=device)
+            self.label_cache[(size, device)]=label
+        return label
+
     def forward(self, pretrained, sent, pos, neg):
         # Find Position (Index) of [EOS]
         eos_pos_sent=[]
@@ -646,57 +774,32 @@ class PrefixSupervisedCPT(nn.Module):
             pad_pos=np.where(enc.numpy()==self.pad_token_id)[0]
             eos_pos_neg.append(len(enc)-1 if len(pad_pos)==0 else pad_pos.min()-1)
 
+        # Sentence, Positive, Hard Negative in One Batch
+        x, attention_mask=concat_batch([sent, pos, neg], preseqlen=self.preseqlen)
+
         # Get Prefix
-        prefix=self.get_prefix(batch_size=sent.shape[0], device=sent.device)
+        prefix=self.get_prefix(batch_size=x.shape[0])
         
         # Forward with Prefix
-        sent=pretrained(sent, past_key_values=prefix)
-        pos=pretrained(pos, past_key_values=prefix)
-        neg=pretrained(neg, past_key_values=prefix)
+        x=pretrained(x, attention_mask=attention_mask, past_key_values=prefix)
         
         # Pooling
-        # Shape: batch_size x hidden_dim
-        repr_sent=self.pooler(sent, eos_pos=eos_pos_sent)
-        repr_pos=self.pooler(pos, eos_pos=eos_pos_pos)
-        repr_neg=self.pooler(neg, eos_pos=eos_pos_neg)
-
-        # Multi-GPU
-        if dist.is_initialized():
-            repr_list_sent=[torch.zeros_like(repr_sent) for _ in range(dist.get_world_size())]
-            repr_list_pos=[torch.zeros_like(repr_pos) for _ in range(dist.get_world_size())]
-            repr_list_neg=[torch.zeros_like(repr_neg) for _ in range(dist.get_world_size())]
-
-            # All Gather
-            dist.all_gather(tensor_list=repr_list_sent, tensor=repr_sent.contiguous())
-            dist.all_gather(tensor_list=repr_list_pos, tensor=repr_pos.contiguous())
-            dist.all_gather(tensor_list=repr_list_neg, tensor=repr_neg.contiguous())
-
-            # Grad Fn
-            repr_list_sent[dist.get_rank()]=repr_sent
-            repr_list_pos[dist.get_rank()]=repr_pos
-            repr_list_neg[dist.get_rank()]=repr_neg
-            
-            # Shape: (world_size * batch_size) x hidden_dim
-            repr_sent=torch.cat(repr_list_sent, dim=0)
-            repr_pos=torch.cat(repr_list_pos, dim=0)
-            repr_neg=torch.cat(repr_list_neg, dim=0)
+        # Shape: (3 * batch_size) x hidden_dim
+        repr_batch=self.pooler(x, eos_pos=eos_pos_sent+eos_pos_pos+eos_pos_neg)
 
-        # 2(Row & Column)-Directional Cosine Similarity
-        sim_pos_x=self.cos_sim(repr_sent.unsqueeze(1), repr_pos.unsqueeze(0))/self.temp
-        sim_neg_x=self.cos_sim(repr_sent.unsqueeze(1), repr_neg.unsqueeze(0))/self.temp
+        # Multi-GPU (Skipped on world_size 1)
+        if self.world_size>1:
+            # All Gather (One Collective for Sentence, Positive, Hard Negative)
+            # Shape: (3 * world_size * batch_size) x hidden_dim
+            repr_batch=all_gather(repr_batch, cache=self.gather_cache, world_size=self.world_size, chunks=3)
 
-        sim_pos_y=self.cos_sim(repr_pos.unsqueeze(1), repr_sent.unsqueeze(0))/self.temp
-        sim_neg_y=self.cos_sim(repr_pos.unsqueeze(1), repr_neg.unsqueeze(0))/self.temp
-        
-        # Contrastive Loss
-        sim_x=torch.cat([sim_pos_x, sim_neg_x], dim=1)
-        sim_y=torch.cat([sim_pos_y, sim_neg_y], dim=1)
+        # Shape: (world_size * batch_size) x hidden_dim
+        repr_sent, repr_pos, repr_neg=repr_batch.chunk(3, dim=0)
+
+        # 2(Row & Column)-Directional Contrastive Loss
+        label=self.get_label(size=repr_sent.size(0), device=repr_sent.device)
+        loss=bidirectional_contrastive_loss(repr_sent, repr_pos, repr_neg, label, self.temp)
 
-        label=torch.arange(sim_x.size(0)).long().to(sim_x.device)
-        loss_x=self.loss(sim_x, label)
-        loss_y=self.loss(sim_y, label)
-        loss=(loss_x+loss_y)/2
-        
         return loss
 
 class PrefixUnsupervisedCPT(nn.Module):
@@ -711,8 +814,8 @@ class PrefixUnsupervisedCPT(nn.Module):
         ## Prefix-Tuning
         # Config of Base (Pre-Trained) LM
         self.base_config=base_config
-        # Input: 0, 1, 2 ... preseqlen
-        self.preseq=torch.arange(preseqlen)
+        # Sequence Length of Prefix
+        self.preseqlen=preseqlen
         # Embedding
         self.embd=nn.Embedding(preseqlen, base_config.hidden_size)
         # Reparam
@@ -721,59 +824,77 @@ class PrefixUnsupervisedCPT(nn.Module):
             nn.ReLU(),
             nn.Linear(hidden_dim, 2*base_config.num_hidden_layers*base_config.hidden_size)
         )
+        # Small Input (preseqlen Rows): Launch-Bound, Compiled to Fuse ReLU into GEMM
+        # Compiled In-Place, so Keys of State Dict are Unchanged
+        self.reparam.compile()
 
         ## CPT
         # "pad_token_id" of Pre-Trained Tokenizer
         self.pad_token_id=pad_token_id
         # Pooling Layer: MLP
         self.mlp=nn.Linear(base_config.hidden_size, base_config.hidden_size)
-        # Cosine Similarity
-        self.cos_sim=nn.CosineSimilarity(dim=-1)
         # Temperature (Hyperparam)
         self.temp=0.07
-        # Contrastive Loss
-        self.loss=nn.CrossEntropyLoss()
+        # Contrastive Loss: Labels Cached on Device, (size, device) -> 0, 1, 2 ... size
+        self.label_cache={}
+        # All Gather: Buffers Reused over Steps, (shape, dtype, device) -> Tensor
+        self.gather_cache={}
+        # Multi-GPU: World Size, Rank Cached (Build Model after Process Group is Created)
+        self.world_size=dist.get_world_size() if dist.is_initialized() else 1
+        self.rank=dist.get_rank() if dist.is_initialized() else 0
         
     def pooler(self, x, eos_pos):
         # [CLS] with MLP (Hyperparam)
         x=x.last_hidden_state
         index=torch.tensor(eos_pos).reshape(-1, 1, 1).expand(-1, -1, x.shape[-1])
         x=torch.gather(x, 1, index.to(x.device)).squeeze(1)
-        return self.mlp(x)
+        # Unit-Norm (Cosine Similarity is Inner Product)
+        return F.normalize(self.mlp(x), dim=-1)
 
-    def get_prefix(self, batch_size, device):
+    def get_prefix(self, batch_size):
         # Return Prefix
-        # batch_size, preseqlen
-        preseq=self.preseq.unsqueeze(0).expand(batch_size, -1).to(device)
-        # batch_size, preseqlen, hidden_size
-        preseq=self.embd(preseq)
-        # batch_size, preseqlen, 2*num_hidden_layers*hidden_size
+        # Prefix is Same for All Samples: Embedding, Reparam Run Only Once (NOT per Sample)
+        # preseqlen, hidden_size
+        # Input 0, 1, 2 ... preseqlen Selects Every Row in Order: Embedding Weight Itself (NO Lookup)
+        preseq=self.embd.weight
+        # preseqlen, 2*num_hidden_layers*hidden_size
         preseq=self.reparam(preseq)
-        # batch_size, preseqlen, 2*num_hidden_layers, num_attention_heads, hidden_size/num_attention_heads
+        # preseqlen, 2*num_hidden_layers, num_attention_heads, hidden_size/num_attention_heads
         preseq=preseq.reshape(
-            batch_size,
-            len(self.preseq),
+            self.preseqlen,
             2*self.base_config.num_hidden_layers,
             self.base_config.num_attention_heads,
             int(self.base_config.hidden_size/self.base_config.num_attention_heads)
         )
+        # 2*num_hidden_layers, num_attention_heads, preseqlen, hidden_size/num_attention_heads
+        # Permuted into Contiguous Layout Once, before Batch Dim is Added
+        preseq=preseq.permute(1, 2, 0, 3).contiguous()
         # 2*num_hidden_layers, batch_size, num_attention_heads, preseqlen, hidden_size/num_attention_heads
-        past_key_values=preseq.permute(2, 0, 3, 1, 4)
+        # Expand: View with Stride 0 on Batch Dim (NO Copy), LM Only Reads Prefix (torch.cat with Key, Value)
+        past_key_values=preseq.unsqueeze(1).expand(-1, batch_size, -1, -1, -1)
 
         return past_key_values.split(2)
 
     def get_embedding(self, pretrained, x):
-        # Return Sentence Representation
+        # Return Sentence Representation (Unit-Norm)
         eos_pos=[]
         for enc in x.cpu():
             pad_pos=np.where(enc.numpy()==self.pad_token_id)[0]
             eos_pos.append(len(enc)-1 if len(pad_pos)==0 else pad_pos.min()-1)
 
-        prefix=self.get_prefix(batch_size=x.shape[0], device=x.device)
+        prefix=self.get_prefix(batch_size=x.shape[0])
         x=pretrained(x, past_key_values=prefix)
 
         return self.pooler(x, eos_pos=eos_pos)
     
+    def get_label(self, size, device):
+        # Return Label of Contrastive Loss (Positive Index)
+        label=self.label_cache.get((size, device))
+        if label is None:
+            label=torch.arange(size, dtype=torch.long, device=device)
+            self.label_cache[(size, device)]=label
+        return label
+
     def forward(self, pretrained, sent, pos):
         # Find Position (Index) of [EOS]
         eos_pos_sent=[]
@@ -785,43 +906,30 @@ class PrefixUnsupervisedCPT(nn.Module):
             pad_pos=np.where(enc.numpy()==self.pad_token_id)[0]
             eos_pos_pos.append(len(enc)-1 if len(pad_pos)==0 else pad_pos.min()-1)
 
+        # Sentence, Positive in One Batch
+        x, attention_mask=concat_batch([sent, pos], preseqlen=self.preseqlen)
+
         # Get Prefix
-        prefix=self.get_prefix(batch_size=sent.shape[0], device=sent.device)
+        prefix=self.get_prefix(batch_size=x.shape[0])
 
         # Forward with Prefix
-        sent=pretrained(sent, past_key_values=prefix)
-        pos=pretrained(pos, past_key_values=prefix)
+        x=pretrained(x, attention_mask=attention_mask, past_key_values=prefix)
         
         # Pooling
-        # Shape: batch_size x hidden_dim
-        repr_sent=self.pooler(sent, eos_pos=eos_pos_sent)
-        repr_pos=self.pooler(pos, eos_pos=eos_pos_pos)
+        # Shape: (2 * batch_size) x hidden_dim
+        repr_batch=self.pooler(x, eos_pos=eos_pos_sent+eos_pos_pos)
 
-        # Multi-GPU
-        if dist.is_initialized():
-            repr_list_sent=[torch.zeros_like(repr_sent) for _ in range(dist.get_world_size())]
-            repr_list_pos=[torch.zeros_like(repr_pos) for _ in range(dist.get_world_size())]
+        # Multi-GPU (Skipped on world_size 1)
+        if self.world_size>1:
+            # All Gather (One Collective for Sentence, Positive)
+            # Shape: (2 * world_size * batch_size) x hidden_dim
+            repr_batch=all_gather(repr_batch, cache=self.gather_cache, world_size=self.world_size, chunks=2)
 
-            # All Gather
-            dist.all_gather(tensor_list=repr_list_sent, tensor=repr_sent.contiguous())
-            dist.all_gather(tensor_list=repr_list_pos, tensor=repr_pos.contiguous())
+        # Shape: (world_size * batch_size) x hidden_dim
+        repr_sent, repr_pos=repr_batch.chunk(2, dim=0)
 
-            # Grad Fn
-            repr_list_sent[dist.get_rank()]=repr_sent
-            repr_list_pos[dist.get_rank()]=repr_pos
-            
-            # Shape: (world_size * batch_size) x hidden_dim
-            repr_sent=torch.cat(repr_list_sent, dim=0)
-            repr_pos=torch.cat(repr_list_pos, dim=0)
+        # 2(Row & Column)-Directional Contrastive Loss
+        label=self.get_label(size=repr_sent.size(0), device=repr_sent.device)
+        loss=bidirectional_contrastive_loss(repr_sent, repr_pos, None, label, self.temp)
 
-        # 2(Row & Column)-Directional Cosine Similarity
-        sim_x=self.cos_sim(repr_sent.unsqueeze(1), repr_pos.unsqueeze(0))/self.temp
-        sim_y=self.cos_sim(repr_pos.unsqueeze(1), repr_sent.unsqueeze(0))/self.temp
-        
-        # Contrastive Loss
-        label=torch.arange(sim_x.size(0)).long().to(sim_x.device)
-        loss_x=self.loss(sim_x, label)
-        loss_y=self.loss(sim_y, label)
-        loss=(loss_x+loss_y)/2
-        
         return loss
@@ -0,0 +1,91 @@
+import pytest
+
+torch=pytest.importorskip("torch")
+transformers=pytest.importorskip("transformers")
+
+import models
+from models import (
+    all_gather,
+    SupervisedSimCSE,
+    UnsupervisedSimCSE,
+    SupervisedCPT,
+    UnsupervisedCPT
+)
+
+# Mocked Process Group
+WORLD_SIZE=2
+RANK=0
+PAD_TOKEN_ID=0
+
+def mock_all_gather_into_tensor(output, input):
+    # Other Rank Holds Different Rows (Reversed Batch)
+    output.copy_(torch.cat([input, input.flip(0)], dim=0))
+
+def mock_reduce_scatter_tensor(output, input):
+    # Sum of Slices (Other Rank Sends the Same Grad)
+    output.copy_(input.reshape(WORLD_SIZE, *output.shape).sum(0))
+
+@pytest.fixture(autouse=True)
+def mock_collectives(monkeypatch):
+    monkeypatch.setattr(models.dist, "all_gather_into_tensor", mock_all_gather_into_tensor)
+    monkeypatch.setattr(models.dist, "reduce_scatter_tensor", mock_reduce_scatter_tensor)
+
+def get_pretrained():
+    # Tiny BERT
+    config=transformers.BertConfig(
+        vocab_size=100,
+        hidden_size=32,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=64,
+        pad_token_id=PAD_TOKEN_ID
+    )
+    return transformers.BertModel(config)
+
+def get_input(batch_size, seq_len):
+    # Random Tokens, Right-Padded
+    x=torch.randint(1, 100, (batch_size, seq_len))
+    x[0, seq_len//2:]=PAD_TOKEN_ID
+    return x
+
+def test_all_gather_multi_step():
+    cache={}
+    x=torch.randn(4, 8, requires_grad=True)
+    for _ in range(3):
+        gathered=all_gather(x, cache=cache, world_size=WORLD_SIZE)
+        gathered.sum().backward()
+
+        # Grad of Own Slice Summed over All Ranks
+        assert torch.equal(x.grad, torch.full_like(x, WORLD_SIZE))
+        x.grad=None
+
+    # Cached Buffer Stays Out of Autograd
+    for buffer in cache.values():
+        assert buffer.grad_fn is None
+        assert not buffer.requires_grad
+
+@pytest.mark.parametrize("model_class, supervised", [
+    (SupervisedSimCSE, True),
+    (UnsupervisedSimCSE, False),
+    (SupervisedCPT, True),
+    (UnsupervisedCPT, False)
+])
+def test_multi_step(model_class, supervised):
+    if model_class in (SupervisedCPT, UnsupervisedCPT):
+        model=model_class(pretrained=get_pretrained(), pad_token_id=PAD_TOKEN_ID)
+    else:
+        model=model_class(pretrained=get_pretrained())
+    # Multi-GPU Path (Process Group Mocked)
+    model.world_size=WORLD_SIZE
+    model.rank=RANK
+
+    optimizer=torch.optim.SGD(model.parameters(), lr=1e-3)
+    # Second Step Fails if Graph of Previous Step is Reached
+    for _ in range(3):
+        batch=[get_input(4, 6), get_input(4, 7)]+([get_input(4, 5)] if supervised else [])
+        loss=model(*batch)
+        loss.backward()
+        optimizer.step()
+        optimizer.zero_grad()
+
+        assert torch.isfinite(loss)